@@ -14,21 +14,34 @@ How to run locally:
   streamlit run app.py
 
 Environment variables supported (optional):
-  BACKEND_BASE_URL, API_KEY, DEMO_USER, DEMO_PASS
+  BACKEND_BASE_URL, API_KEY, DEMO_USER, DEMO_PASS,
+  PRESIGNED_UPLOADS (set to 1 to upload documents via API_PATHS["presign"] instead of multipart)
+  WEBP_UPLOADS (set to 1 to re-encode JPEG/PNG documents as WebP before upload)
 
 Replace the API endpoints in `API_PATHS` to match your backend.
 """
 
+import hashlib
 import io
 import json
 import os
+import re
 import time
-from typing import Dict, Any, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Dict, Any, List, Tuple
 
-import requests
+import httpx
 import streamlit as st
-from pydantic import BaseModel, EmailStr, Field, validator
-from pyvis.network import Network
+
+try:  # listed in requirements.txt; the stdlib json fallback keeps bare installs working
+    import orjson
+except ImportError:
+    orjson = None
+
+try:  # listed in requirements.txt; without it large graphs fall back to in-browser physics
+    import igraph as ig
+except ImportError:
+    ig = None
 
 # ---------------------------
 # Config & Constants
@@ -39,28 +52,117 @@ st.set_page_config(page_title="User Graph Self‑Service", page_icon="🕸️",
 API_PATHS = {
     "auth": "/v1/auth/login",  # POST {email, password} -> {token}
     "graph": "/v1/graph/fetch", # POST payload -> { nodes: [...], edges: [...] }
+    "presign": "/v1/uploads/presign",  # POST {filename, content_type} -> {url, key, headers}
 }
 
+# Backend tokens are reused for this long before the login form is shown again.
+TOKEN_TTL_SECONDS = 3500
+
+# With WEBP_UPLOADS enabled, image uploads are re-encoded as WebP at this quality before leaving the app.
+WEBP_QUALITY = 85
+
+# How often a pending background fetch is polled while the UI waits for it.
+FETCH_POLL_SECONDS = 0.5
+
+# Above this many nodes + edges the raw response is summarised instead of rendered with st.json.
+JSON_TREE_MAX_ITEMS = 2000
+JSON_PREVIEW_ITEMS = 50
+
+# Above this many nodes, skip PyVis and embed the vis-network dataset as JSON directly.
+LARGE_GRAPH_NODES = 1000
+# Edges are embedded in shards of this size and added to the network one shard per frame.
+EDGE_SHARD_SIZE = 5000
+# Pixels per sqrt(node) of the precomputed layout's bounding box.
+LAYOUT_SCALE = 40
+VIS_NETWORK_JS = "https://unpkg.com/vis-network@9.1.9/standalone/umd/vis-network.min.js"
+
 DEFAULTS = {
     "base_url": os.getenv("BACKEND_BASE_URL", "https://api.example.com"),
     "api_key": os.getenv("API_KEY", ""),
     "demo_user": os.getenv("DEMO_USER", "demo@example.com"),
     "demo_pass": os.getenv("DEMO_PASS", "password123"),
+    # Opt-in: only backends that implement API_PATHS["presign"] should enable this.
+    "presigned_uploads": os.getenv("PRESIGNED_UPLOADS", "").lower() in ("1", "true", "yes"),
+    # Opt-in: only for backends that accept lossy image/webp in place of the original JPEG/PNG.
+    "webp_uploads": os.getenv("WEBP_UPLOADS", "").lower() in ("1", "true", "yes"),
 }
 
-class InputPayload(BaseModel):
-    phone: str = Field("", description="User's phone number")
-    email: EmailStr | None = Field(None, description="User's email address")
-
-    @validator("phone")
-    def phone_must_look_valid(cls, v: str):
-        p = v.strip()
-        if not p:
-            raise ValueError("Phone is required")
-        digits = [c for c in p if c.isdigit()]
-        if len(digits) < 7:
-            raise ValueError("Phone looks too short")
-        return p
+_MIN_PHONE_DIGITS = 7
+
+# Streamlit re-executes this script on every rerun; building the model inside a cached
+# resource keeps the pydantic import and class construction to once per process.
+@st.cache_resource(show_spinner=False)
+def _input_model() -> type:
+    from pydantic import BaseModel, EmailStr, Field, field_validator
+
+    class InputPayload(BaseModel):
+        phone: str = Field("", description="User's phone number")
+        email: EmailStr | None = Field(None, description="User's email address")
+
+        @field_validator("phone")
+        @classmethod
+        def phone_must_look_valid(cls, v: str) -> str:
+            p = v.strip()
+            if not p:
+                raise ValueError("Phone is required")
+            digits = 0
+            for c in p:
+                if c.isdigit():
+                    digits += 1
+                    if digits >= _MIN_PHONE_DIGITS:
+                        break
+            else:
+                raise ValueError("Phone looks too short")
+            return p
+
+    return InputPayload
+
+def _json_dumps(obj: Any, *, indent: bool = False, sort_keys: bool = False) -> str:
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=str, option=option).decode()
+    return json.dumps(obj, default=str, indent=2 if indent else None, sort_keys=sort_keys)
+
+def _json_loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _endpoints(base_url: str) -> Dict[str, str]:
+    b = base_url.rstrip("/")
+    return {k: b + v for k, v in API_PATHS.items()}
+
+def _json_from_multipart(body: bytes, content_type: str) -> Any:
+    """Parse the first application/json part of a multipart response body.
+
+    Parts are located with `bytes.find` on the boundary rather than a line-by-line scan.
+    """
+    boundary = ""
+    for param in content_type.split(";")[1:]:
+        name, _, value = param.strip().partition("=")
+        if name.lower() == "boundary":
+            boundary = value.strip('"')
+    if not boundary:
+        raise ValueError("multipart response has no boundary")
+
+    delim = b"--" + boundary.encode()
+    pos = body.find(delim)
+    while pos != -1:
+        start = pos + len(delim)
+        if body.startswith(b"--", start):  # closing delimiter
+            break
+        end = body.find(b"\r\n" + delim, start)
+        if end == -1:
+            break
+        head, sep, content = body[start:end].partition(b"\r\n\r\n")
+        if sep and b"application/json" in head.lower():
+            return _json_loads(content)
+        pos = end + 2
+    raise ValueError("multipart response has no application/json part")
 
 def _headers(api_key: str | None, bearer: str | None) -> Dict[str, str]:
     h = {"Accept": "application/json"}
@@ -70,61 +172,147 @@ def _headers(api_key: str | None, bearer: str | None) -> Dict[str, str]:
         h["Authorization"] = f"Bearer {bearer}"
     return h
 
-@st.cache_data(ttl=300, show_spinner=False)
+@st.cache_resource(show_spinner=False)
+def get_client() -> httpx.Client:
+    """Shared HTTP/2-capable client so pooled connections survive Streamlit reruns.
+
+    Treat the returned client as read-only; pass per-request headers to `.post()`.
+    """
+    # No custom transport: that would disable HTTP(S)_PROXY handling from the environment.
+    return httpx.Client(
+        http2=True,
+        timeout=20.0,
+        limits=httpx.Limits(max_keepalive_connections=8),
+        follow_redirects=True,  # requests followed redirects by default
+    )
+
+def _sha256_digest(fileobj: IO[bytes]) -> str:
+    """Hex SHA-256 of an in-memory upload, hashed from its buffer without copying."""
+    if isinstance(fileobj, io.BytesIO):
+        return hashlib.sha256(fileobj.getbuffer()).hexdigest()
+    fileobj.seek(0)
+    return hashlib.sha256(fileobj.read()).hexdigest()
+
+def _file_size(fileobj: IO[bytes]) -> int:
+    if isinstance(fileobj, io.BytesIO):
+        return fileobj.getbuffer().nbytes
+    size = fileobj.seek(0, io.SEEK_END)
+    fileobj.seek(0)
+    return size
+
+def _upload_presigned(
+    presign_url: str,
+    headers: Dict[str, str],
+    fileobj: IO[bytes],
+    filename: str,
+    mimetype: str | None,
+    timeout: int,
+) -> str | None:
+    """PUT the document straight to storage through a backend-issued presigned URL.
+
+    Returns the object key, or None if the backend has no presign endpoint (callers fall back to multipart).
+    """
+    client = get_client()
+    content_type = mimetype or "application/octet-stream"
+    resp = client.post(presign_url, headers=headers, json={"filename": filename, "content_type": content_type}, timeout=timeout)
+    if resp.status_code in (404, 405, 501):
+        return None
+    if resp.status_code != 200:
+        raise RuntimeError(f"Presign error {resp.status_code}: {resp.text}")
+    ticket = _json_loads(resp.content)
+    if not isinstance(ticket, dict) or not ticket.get("url") or not ticket.get("key"):
+        raise RuntimeError(f"Presign response missing url/key: {ticket}")
+
+    # Storage URLs carry their own auth, so none of the backend headers are forwarded. An explicit
+    # Content-Length keeps httpx from switching to chunked encoding, which S3-style PUTs reject.
+    put_headers = {"Content-Type": content_type, **(ticket.get("headers") or {}), "Content-Length": str(_file_size(fileobj))}
+    fileobj.seek(0)
+    chunks = iter(lambda: fileobj.read(64 * 1024), b"")
+    put = client.put(ticket["url"], headers=put_headers, content=chunks, timeout=timeout)
+    if put.status_code not in (200, 201, 204):
+        raise RuntimeError(f"Upload error {put.status_code}: {put.text}")
+    return ticket["key"]
+
+# `_fileobj` is excluded from the cache key (leading underscore); `vehicle_doc_sha256` stands in for it.
+@st.cache_data(ttl=300, max_entries=32, show_spinner=False)
 def fetch_user_graph(
     base_url: str,
     api_key: str | None,
     bearer: str | None,
     payload: Dict[str, Any],
-    vehicle_doc: bytes | None,
+    vehicle_doc_sha256: str | None,
+    _fileobj: IO[bytes] | None,
     filename: str | None,
+    mimetype: str | None = None,
     timeout: int = 20,
 ) -> Dict[str, Any]:
-    url = base_url.rstrip("/") + API_PATHS["graph"]
+    urls = _endpoints(base_url)
+    url = urls["graph"]
     headers = _headers(api_key, bearer)
 
     try:
-        if vehicle_doc and filename:
-            files = {"vehicle_document": (filename, vehicle_doc)}
-            data = {k: json.dumps(v) if isinstance(v, (dict, list)) else str(v) for k, v in payload.items()}
-            resp = requests.post(url, headers=headers, files=files, data=data, timeout=timeout)
+        object_key = None
+        if _fileobj is not None and filename and DEFAULTS["presigned_uploads"]:
+            object_key = _upload_presigned(urls["presign"], headers, _fileobj, filename, mimetype, timeout)
+
+        if object_key is None and _fileobj is not None and filename:
+            # Presigned uploads disabled or unsupported: send the document inline.
+            # httpx reads the file object in chunks while sending, so the document is not copied into the body.
+            _fileobj.seek(0)
+            files = {"vehicle_document": (filename, _fileobj, mimetype or "application/octet-stream")}
+            if all(type(v) is str for v in payload.values()):
+                data = payload  # flat string fields (the InputPayload case) go out as-is
+            else:
+                data = {k: _json_dumps(v) if isinstance(v, (dict, list)) else str(v) for k, v in payload.items()}
+            resp = get_client().post(url, headers=headers, files=files, data=data, timeout=timeout)
         else:
-            resp = requests.post(url, headers={**headers, "Content-Type": "application/json"}, json=payload, timeout=timeout)
+            if object_key is not None:
+                payload = {**payload, "vehicle_document_key": object_key}
+            resp = get_client().post(url, headers={**headers, "Content-Type": "application/json"}, json=payload, timeout=timeout)
 
         if resp.status_code == 200:
-            return resp.json()
+            content_type = resp.headers.get("content-type", "")
+            if content_type.startswith("multipart/"):
+                return _json_from_multipart(resp.content, content_type)
+            return _json_loads(resp.content)
         else:
             try:
-                problem = resp.json()
+                problem = _json_loads(resp.content)
             except Exception:
                 problem = {"message": resp.text}
             raise RuntimeError(f"Backend error {resp.status_code}: {problem}")
-    except requests.exceptions.RequestException as e:
+    except (httpx.HTTPError, httpx.InvalidURL) as e:
         raise RuntimeError(f"Network error: {e}")
+    except ValueError as e:
+        raise RuntimeError(f"Backend returned invalid JSON: {e}")
+
+# Node keys already shown as the id/label, so they are left out of the hover title.
+_NODE_SKIP = frozenset(("id", "key", "name", "label"))
 
 def build_pyvis_graph(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> str:
+    from pyvis.network import Network
+
     net = Network(height="650px", width="100%", directed=True, bgcolor="#ffffff")
     net.barnes_hut()
 
+    add_node, add_edge = net.add_node, net.add_edge
     for n in nodes:
-        node_id = n.get("id") or n.get("key") or n.get("name")
+        get = n.get
+        node_id = get("id") or get("key") or get("name")
         if node_id is None:
             continue
-        label = n.get("label") or str(node_id)
-        title_parts = [f"<b>{label}</b>"]
-        for k, v in n.items():
-            if k not in {"id", "key", "name", "label"}:
-                title_parts.append(f"{k}: {v}")
-        title = "<br/>".join(title_parts)
-        net.add_node(node_id, label=label, title=title)
+        label = get("label") or str(node_id)
+        title = f"<b>{label}</b>" + "".join(f"<br/>{k}: {v}" for k, v in n.items() if k not in _NODE_SKIP)
+        add_node(node_id, label=label, title=title)
 
     for e in edges:
-        src = e.get("source") or e.get("from")
-        dst = e.get("target") or e.get("to")
+        get = e.get
+        src = get("source") or get("from")
+        dst = get("target") or get("to")
         if src is None or dst is None:
             continue
-        label = e.get("label") or e.get("relation")
-        net.add_edge(src, dst, title=label, label=label)
+        label = get("label") or get("relation")
+        add_edge(src, dst, title=label, label=label)
 
     net.set_options(
         """
@@ -135,12 +323,189 @@ def build_pyvis_graph(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]])
         }
         """
     )
-    return net.generate_html("graph.html")
+    return net.generate_html(notebook=False)
+
+
+_FAST_GRAPH_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <script src="__VIS_JS__"></script>
+  <style>html, body { margin: 0; } #graph { width: 100%; height: 650px; background: #ffffff; }</style>
+</head>
+<body>
+  <div id="graph"></div>
+__EDGE_SHARDS__
+  <script>
+    const NODES = __NODES__;
+    // vis-network renders string titles as plain text; wrap them so the <b>/<br/> markup shows as in PyVis.
+    for (const n of NODES) {
+      const el = document.createElement('div');
+      el.innerHTML = n.title;
+      n.title = el;
+    }
+    const options = {
+      physics: __PHYSICS__,
+      nodes: { shape: 'dot', scaling: { min: 8, max: 28 }},
+      edges: { arrows: { to: {enabled: true} }, smooth: false }
+    };
+    // Draw the nodes first, then feed edge shards in so the layout starts before every edge is parsed.
+    const edges = new vis.DataSet();
+    new vis.Network(document.getElementById('graph'), { nodes: new vis.DataSet(NODES), edges }, options);
+    const shards = document.querySelectorAll('script.edge-shard');
+    let next = 0;
+    function addShard() {
+      if (next >= shards.length) return;
+      edges.add(JSON.parse(shards[next++].textContent));
+      requestAnimationFrame(addShard);
+    }
+    requestAnimationFrame(addShard);
+  </script>
+</body>
+</html>
+"""
+
+_PLACEHOLDER_RE = re.compile(r"__(VIS_JS|EDGE_SHARDS|PHYSICS|NODES)__")
+
+def _embed_json(obj: Any) -> str:
+    # Keep "</script>" inside string values from closing the inline script block.
+    return _json_dumps(obj).replace("</", "<\\/")
+
+def _precomputed_layout(node_ids: List[Any], edges: List[Dict[str, Any]]) -> List[Tuple[float, float]] | None:
+    """DrL layout computed with igraph, scaled to vis-network pixels; None if igraph is unavailable."""
+    if ig is None or not node_ids:
+        return None
+    index = {nid: i for i, nid in enumerate(node_ids)}
+    pairs = [(index[e["from"]], index[e["to"]]) for e in edges if e["from"] in index and e["to"] in index]
+    coords = ig.Graph(n=len(node_ids), edges=pairs, directed=True).layout_drl().coords
+
+    xs = [c[0] for c in coords]
+    ys = [c[1] for c in coords]
+    mid_x, mid_y = (max(xs) + min(xs)) / 2, (max(ys) + min(ys)) / 2
+    span = max(max(xs) - min(xs), max(ys) - min(ys)) or 1.0
+    scale = LAYOUT_SCALE * len(node_ids) ** 0.5 / span
+    return [((x - mid_x) * scale, (y - mid_y) * scale) for x, y in coords]
+
+def build_graph_html_fast(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> str:
+    """Render the graph as a standalone vis-network page without going through PyVis."""
+    vis_nodes = []
+    append = vis_nodes.append
+    seen = set()  # vis.DataSet throws on a repeated id; keep the first, as PyVis's add_node does
+    for n in nodes:
+        get = n.get
+        node_id = get("id") or get("key") or get("name")
+        if node_id is None or node_id in seen:
+            continue
+        seen.add(node_id)
+        label = get("label") or str(node_id)
+        title = f"<b>{label}</b>" + "".join(f"<br/>{k}: {v}" for k, v in n.items() if k not in _NODE_SKIP)
+        append({"id": node_id, "label": label, "title": title})
 
+    vis_edges = []
+    append = vis_edges.append
+    for e in edges:
+        get = e.get
+        src = get("source") or get("from")
+        dst = get("target") or get("to")
+        if src is None or dst is None:
+            continue
+        edge = {"from": src, "to": dst}
+        label = get("label") or get("relation")
+        if label:
+            edge["label"] = edge["title"] = str(label)
+        append(edge)
+
+    positions = _precomputed_layout([n["id"] for n in vis_nodes], vis_edges)
+    if positions is not None:
+        for node, (x, y) in zip(vis_nodes, positions):
+            node["x"], node["y"] = x, y
+        physics = "{ enabled: false }"
+    else:
+        physics = "{ solver: 'barnesHut', stabilization: true }"
+
+    shards = "\n".join(
+        f'  <script type="application/json" class="edge-shard">{_embed_json(vis_edges[i:i + EDGE_SHARD_SIZE])}</script>'
+        for i in range(0, len(vis_edges), EDGE_SHARD_SIZE)
+    )
+    # One pass over the template, so placeholder-like text inside graph data is never substituted.
+    fills = {
+        "VIS_JS": VIS_NETWORK_JS,
+        "EDGE_SHARDS": shards,
+        "PHYSICS": physics,
+        "NODES": _embed_json(vis_nodes),
+    }
+    return _PLACEHOLDER_RE.sub(lambda m: fills[m.group(1)], _FAST_GRAPH_TEMPLATE)
+
+
+def _graph_key(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> str:
+    blob = _json_dumps({"nodes": nodes, "edges": edges}, sort_keys=True).encode()
+    return hashlib.md5(blob, usedforsecurity=False).hexdigest()
+
+# Keyed on `graph_key` only; the caller computes it once per fetched graph.
+@st.cache_data(max_entries=8, show_spinner=False)
+def build_graph_html_cached(graph_key: str, _nodes: List[Dict[str, Any]], _edges: List[Dict[str, Any]]) -> str:
+    if len(_nodes) > LARGE_GRAPH_NODES:
+        return build_graph_html_fast(_nodes, _edges)
+    return build_pyvis_graph(_nodes, _edges)
+
+
+# Keyed on the upload digest; `_fileobj` is not hashed.
+@st.cache_data(max_entries=16, show_spinner=False)
+def _to_webp(vehicle_doc_sha256: str, _fileobj: IO[bytes]) -> bytes | None:
+    """WebP re-encoding of an image upload, or None if Pillow can't decode it or it wouldn't be smaller."""
+    from PIL import Image, ImageOps, features
+
+    if not features.check("webp"):
+        return None
+    _fileobj.seek(0)
+    buf = io.BytesIO()
+    try:
+        with Image.open(_fileobj) as img:
+            # Bake in EXIF rotation, since the re-encoded file carries no EXIF orientation.
+            ImageOps.exif_transpose(img).save(buf, "WEBP", quality=WEBP_QUALITY)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    data = buf.getvalue()
+    return data if len(data) < _file_size(_fileobj) else None
+
+@st.cache_resource(show_spinner=False)
+def _pool() -> ThreadPoolExecutor:
+    """Worker threads shared by all sessions, so uploads and graph fetches don't block the script thread."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="usergraph-fetch")
+
+def _fetch_graph_job(
+    base_url: str,
+    api_key: str | None,
+    bearer: str | None,
+    payload: Dict[str, Any],
+    fileobj: IO[bytes] | None,
+    filename: str | None,
+    mimetype: str | None,
+) -> Tuple[Dict[str, Any], str]:
+    """Hash (and, if enabled, re-encode images of) the upload, fetch the graph and key it for rendering; runs on `_pool()`."""
+    digest = _sha256_digest(fileobj) if fileobj is not None else None
+    if DEFAULTS["webp_uploads"] and digest and filename and mimetype in ("image/jpeg", "image/png"):
+        webp = _to_webp(digest, fileobj)
+        if webp is not None:
+            fileobj, filename, mimetype = io.BytesIO(webp), filename.rsplit(".", 1)[0] + ".webp", "image/webp"
+    graph_resp = fetch_user_graph(base_url, api_key, bearer, payload, digest, fileobj, filename, mimetype)
+    return graph_resp, _graph_key(graph_resp.get("nodes", []), graph_resp.get("edges", []))
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _graph_json_bytes(graph_key: str, _graph: Dict[str, Any]) -> bytes:
+    return _json_dumps(_graph).encode()
 
 def download_bytes(name: str, content: bytes, mime: str):
     st.download_button(label=f"Download {name}", data=content, file_name=name, mime=mime)
 
+def _cached_token(key: Tuple[str, str]) -> str | None:
+    """Unexpired backend token for (base_url, email) from this session, if any."""
+    entry = st.session_state.tokens.get(key)
+    if entry and entry["exp"] > time.time():
+        return entry["token"]
+    return None
+
 # Sidebar config
 with st.sidebar:
     st.header("⚙️ Backend Settings")
@@ -153,6 +518,17 @@ with st.sidebar:
 
 if "auth_token" not in st.session_state:
     st.session_state.auth_token = None
+    st.session_state.auth_key = None
+    st.session_state.tokens = {}
+
+# Lazy refresh: when the backend token expires or the base URL changes, switch to a cached
+# token for the new (base_url, email) if there is one, otherwise fall back to the login form.
+# Demo tokens have no auth_key and never expire.
+auth_key = st.session_state.auth_key
+if st.session_state.auth_token and auth_key and (auth_key[0] != base_url or _cached_token(auth_key) is None):
+    auth_key = (base_url, auth_key[1])
+    st.session_state.auth_token = _cached_token(auth_key)
+    st.session_state.auth_key = auth_key if st.session_state.auth_token else None
 
 st.title("🕸️ User Graph Self‑Service")
 
@@ -164,18 +540,25 @@ if not st.session_state.auth_token:
         password = st.text_input("Password", type="password", value=demo_pass)
         login_btn = st.form_submit_button("Sign in")
 
+    # An explicit sign-in always checks the password with the backend; cached tokens are only
+    # reused by the lazy refresh above.
     if login_btn:
+        auth_key = (base_url, email)
         try:
-            auth_url = base_url.rstrip("/") + API_PATHS["auth"]
-            resp = requests.post(auth_url, json={"email": email, "password": password}, headers=_headers(api_key, None), timeout=20)
+            auth_url = _endpoints(base_url)["auth"]
+            resp = get_client().post(auth_url, json={"email": email, "password": password}, headers=_headers(api_key, None), timeout=20)
             if resp.status_code == 200:
-                token = resp.json().get("token") or resp.json().get("access_token")
+                body = _json_loads(resp.content)
+                token = body.get("token") or body.get("access_token")
+                if token:
+                    st.session_state.tokens[auth_key] = {"token": token, "exp": time.time() + TOKEN_TTL_SECONDS}
+                    st.session_state.auth_key = auth_key
                 st.session_state.auth_token = token or f"demo-{int(time.time())}"
                 st.success("Logged in!")
             else:
                 st.session_state.auth_token = f"demo-{int(time.time())}"
                 st.warning("Auth failed, using demo token.")
-        except requests.exceptions.RequestException:
+        except (httpx.HTTPError, httpx.InvalidURL, ValueError):
             st.session_state.auth_token = f"demo-{int(time.time())}"
             st.info("Auth API not reachable, using demo token.")
 
@@ -187,29 +570,64 @@ if st.session_state.auth_token:
         uploaded = st.file_uploader("Vehicle document (optional)", type=["pdf", "jpg", "jpeg", "png"])
         submitted = st.form_submit_button("Fetch Graph 🕸️")
 
-    if submitted:
+    if submitted and st.session_state.get("graph_future"):
+        st.warning("A graph fetch is already running.")
+    elif submitted:
         try:
-            payload_obj = InputPayload(phone=phone_in, email=email_in or None)
-            file_bytes = uploaded.read() if uploaded else None
+            payload_obj = _input_model()(phone=phone_in, email=email_in or None)
             filename = uploaded.name if uploaded else None
-            graph_resp = fetch_user_graph(base_url, api_key, st.session_state.auth_token, payload_obj.dict(exclude_none=True), file_bytes, filename)
-            st.session_state.graph_resp = graph_resp
-            st.success("Graph fetched!")
+            mimetype = uploaded.type if uploaded else None
+            st.session_state.graph_future = _pool().submit(
+                _fetch_graph_job, base_url, api_key, st.session_state.auth_token,
+                payload_obj.model_dump(exclude_none=True), uploaded, filename, mimetype,
+            )
         except Exception as e:
             st.error(str(e))
 
+# Check on the background fetch outside the auth gate, so a fetch that outlives the token still
+# completes and reports; the rerun that polls it again is scheduled at the end of the script.
+fut = st.session_state.get("graph_future")
+if fut is not None and fut.done():
+    st.session_state.graph_future = None
+    try:
+        st.session_state.graph_resp, st.session_state.graph_key = fut.result()
+        st.success("Graph fetched!")
+    except Exception as e:
+        st.error(str(e))
+elif fut is not None:
+    if st.button("Cancel fetch"):
+        fut.cancel()  # no-op once running; the result is discarded either way
+        st.session_state.graph_future = None
+        st.info("Fetch cancelled.")
+    else:
+        st.info("Fetching graph…")
+
 if st.session_state.get("graph_resp"):
     graph = st.session_state.graph_resp
     nodes = graph.get("nodes", [])
     edges = graph.get("edges", [])
 
+    graph_key = st.session_state.get("graph_key") or _graph_key(nodes, edges)
+
     st.subheader("Graph Overview")
-    st.json(graph)
+    # st.json builds a DOM node per JSON leaf; large graphs get a summary, a preview and a download instead.
+    if len(nodes) + len(edges) > JSON_TREE_MAX_ITEMS:
+        st.write(f"{len(nodes)} nodes, {len(edges)} edges — showing the first {JSON_PREVIEW_ITEMS} of each.")
+        preview = {"nodes": nodes[:JSON_PREVIEW_ITEMS], "edges": edges[:JSON_PREVIEW_ITEMS]}
+        st.code(_json_dumps(preview, indent=True), language="json")
+    else:
+        st.json(graph)
+    download_bytes("graph.json", _graph_json_bytes(graph_key, graph), "application/json")
 
     try:
-        html = build_pyvis_graph(nodes, edges)
+        html = build_graph_html_cached(graph_key, nodes, edges)
         st.components.v1.html(html, height=680, scrolling=True)
     except Exception as e:
         st.warning(f"Could not render interactive graph: {e}")
 
 st.caption("Built with Streamlit • Replace API_PATHS to match your backend.")
+
+# Poll a pending fetch only after the rest of the page has rendered.
+if st.session_state.get("graph_future"):
+    time.sleep(FETCH_POLL_SECONDS)
+    st.rerun()